@@ -0,0 +1,34 @@
+from flask import request
+from app.config import Config
+
+# Optional caching (backend shared across workers; see Config.CACHE_TYPE)
+try:
+    from flask_caching import Cache
+    cache = Cache(config={
+        "CACHE_TYPE": Config.CACHE_TYPE,
+        "CACHE_DEFAULT_TIMEOUT": Config.CACHE_DEFAULT_TIMEOUT,
+        "CACHE_DIR": Config.CACHE_DIR,
+        "CACHE_REDIS_URL": Config.CACHE_REDIS_URL,
+    })
+except ImportError:
+    cache = None
+
+
+def cached(**kwargs):
+    """cache.cached(...) when flask-caching is installed, otherwise a no-op."""
+    if cache:
+        return cache.cached(**kwargs)
+    return lambda view: view
+
+
+def http_cacheable(response, max_age=60):
+    """after_request hook: Cache-Control + ETag on successful GETs, and a
+    304 when the client's If-None-Match already matches.
+
+    Views may set their own ETag; otherwise one is derived from the body.
+    """
+    if request.method != "GET" or response.status_code != 200:
+        return response
+    response.headers["Cache-Control"] = f"public, max-age={max_age}"
+    response.add_etag()
+    return response.make_conditional(request)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,8 +12,27 @@ class Config:
     DB_PORT = os.getenv("PGPORT", "5432")
     DB_NAME = os.getenv("DB_NAME", "nyc_taxi")
 
+    # psycopg (v3) driver for the API: it can server-side prepare repeated
+    # statements, which psycopg2 cannot. The loader scripts stay on psycopg2.
     SQLALCHEMY_DATABASE_URI = (
-        f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+        f"postgresql+psycopg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     )
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool (shared by all API routes)
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    # Executions of the same query on a connection before it is prepared
+    DB_PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", "1"))
+
+    # Response cache. It must be shared by all gunicorn workers, otherwise
+    # the delete after /api/refresh-trip-analytics only clears one of them:
+    # FileSystemCache (default, one host) or RedisCache (CACHE_REDIS_URL).
+    # SimpleCache is per process and only suits the single-process dev server.
+    CACHE_TYPE = os.getenv("CACHE_TYPE", "FileSystemCache")
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv("CACHE_DEFAULT_TIMEOUT", "600"))
+    CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(tempfile.gettempdir(), "nyc_taxi_api_cache"))
+    CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
@@ -1,12 +1,96 @@
+from functools import lru_cache
+from flask import g
 from sqlalchemy import create_engine, text
 from app.config import Config
 
-# Create global SQLAlchemy engine using URI from Config class
-engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+# Create global SQLAlchemy engine using URI from Config class.
+# Pool is sized for concurrent API requests; pre_ping drops stale connections
+# and statement_timeout keeps a runaway query from pinning a connection.
+# prepare_threshold makes psycopg prepare the route queries server-side once
+# they repeat, so hot endpoints skip parse/plan on later requests. The API
+# only reads, so it runs in AUTOCOMMIT: with a transaction, the pool's
+# reset-on-return ROLLBACK would clear psycopg's prepared-statement
+# counters after every request and nothing would ever get prepared.
+engine = create_engine(
+    Config.SQLALCHEMY_DATABASE_URI,
+    isolation_level="AUTOCOMMIT",
+    pool_size=Config.DB_POOL_SIZE,
+    max_overflow=Config.DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    pool_recycle=Config.DB_POOL_RECYCLE,
+    connect_args={
+        "options": f"-c statement_timeout={Config.DB_STATEMENT_TIMEOUT_MS}",
+        "prepare_threshold": Config.DB_PREPARE_THRESHOLD,
+    },
+)
+
+
+def get_conn():
+    """Connection for the current request, checked out on first use.
+
+    All queries in a request share it; close_conn returns it to the pool
+    when the app context tears down.
+    """
+    if "db_conn" not in g:
+        g.db_conn = engine.connect()
+    return g.db_conn
+
+
+def close_conn(exc=None):
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        conn.close()
+
 
 def run_query(query, params=None):
-    """Run a SQL query and return results as list of dicts."""
-    with engine.connect() as conn:
-        result = conn.execute(text(query), params or {})
-        rows = [dict(r._mapping) for r in result]
+    """Run a SQL query on the request's connection; rows as list of dicts."""
+    result = get_conn().execute(text(query), params or {})
+    return [dict(r) for r in result.mappings()]
+
+
+def round_fields(rows, digits):
+    """Round float aggregates in place, e.g. digits={"avg_fare": 2}.
+
+    Aggregates are kept as float8 in SQL (much cheaper than numeric) and
+    only rounded here for presentation.
+    """
+    for row in rows:
+        for col, n in digits.items():
+            if row[col] is not None:
+                row[col] = round(row[col], n)
     return rows
+
+
+@lru_cache(maxsize=None)
+def compile_query(head, conditions, tail):
+    """text() for head + AND-ed conditions + tail, built once per combination.
+
+    `head` must already end in a WHERE clause and `conditions` is a tuple of
+    filter snippets, so each route only ever sees a few dozen distinct
+    statements and reuses the same TextClause (and prepared plan) for each.
+    """
+    sql = head
+    if conditions:
+        sql += " AND " + " AND ".join(conditions)
+    return text(sql + tail)
+
+
+@lru_cache(maxsize=None)
+def compile_raw_query(head, conditions, tail):
+    """compile_query's statement rendered for the driver (%(name)s params)."""
+    return str(compile_query(head, conditions, tail).compile(dialect=engine.dialect))
+
+
+def fetch_binary(sql, params):
+    """Run driver-level SQL on a binary-format psycopg cursor.
+
+    Values arrive in Postgres' binary wire format (no text parsing of floats
+    and timestamps) and rows come back as plain tuples, skipping SQLAlchemy
+    Row construction. The cursor is client-side, so the query is a single
+    round trip and can be prepared. Returns (column_names, rows).
+    """
+    driver_conn = get_conn().connection.driver_connection
+    with driver_conn.cursor(binary=True) as cur:
+        cur.execute(sql, params)
+        columns = [d.name for d in cur.description]
+        return columns, cur.fetchall()
@@ -0,0 +1,17 @@
+from flask.json.provider import DefaultJSONProvider
+
+# Optional fast JSON encoding
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Encode responses with orjson, falling back to Flask's handling for
+    types orjson doesn't know (Decimal, etc.)."""
+
+    # DefaultJSONProvider.response() serializes through dumps(), so this
+    # covers jsonify() too
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
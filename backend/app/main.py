@@ -1,6 +1,8 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
-from app.db import run_query
+from app.db import run_query, close_conn
+from app.cache import cache
+from app.json_provider import OrjsonProvider, orjson
 
 
 
@@ -16,6 +18,15 @@ def create_app():
     app = Flask(__name__)
     CORS(app)
 
+    if orjson:
+        app.json = OrjsonProvider(app)
+
+    if cache:
+        cache.init_app(app)
+
+    # Return the request-scoped DB connection (app.db.get_conn) to the pool
+    app.teardown_appcontext(close_conn)
+
     # Register Blueprints
     app.register_blueprint(analytics_bp)  
     app.register_blueprint(map_bp)        
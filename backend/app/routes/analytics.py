@@ -1,116 +1,136 @@
-from flask import Blueprint, jsonify
-from sqlalchemy import create_engine, text
-from app.config import Config
+from flask import Blueprint, current_app, jsonify
+from sqlalchemy import text
+from app.db import engine, get_conn
+from app.utils import timestamp
+from app.cache import cache, cached, http_cacheable
 import time
-import datetime
-
-# Optional caching
-try:
-    from flask_caching import Cache
-    cache = Cache(config={'CACHE_TYPE': 'SimpleCache', 'CACHE_DEFAULT_TIMEOUT': 600})
-except ImportError:
-    cache = None
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 analytics_bp = Blueprint("analytics", __name__)
-engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+analytics_bp.after_request(http_cacheable)
 
+# Cache key for the dashboard payload (the whole cache is cleared after a
+# manual MV refresh)
+TRIP_ANALYTICS_CACHE_KEY = "trip_analytics"
 
-@analytics_bp.record_once
-def on_load(state):
-    app = state.app
-    if cache:
-        cache.init_app(app)
 
+# 1st Feature — Trip Analytics Dashboard (Materialized Views)
+
+# The whole dashboard payload is assembled by Postgres in one statement and
+# returned as JSON text, so Python neither decodes nor re-encodes the rows.
+TRIP_ANALYTICS_QUERY = text("""
+    SELECT json_build_object(
+        -- 1) Global KPIs (single row). Formatted as Flask's JSON encoder
+        --    sent them before this payload was built in SQL: numeric
+        --    aggregates as strings, timestamps as HTTP dates.
+        'kpis',
+        COALESCE((SELECT row_to_json(k) FROM (
+            SELECT
+                total_trips,
+                total_revenue::text AS total_revenue,
+                avg_fare::text AS avg_fare,
+                avg_distance::text AS avg_distance,
+                avg_duration_min::text AS avg_duration_min,
+                to_char(min_pickup_time, 'Dy, DD Mon YYYY HH24:MI:SS "GMT"') AS min_pickup_time,
+                to_char(max_pickup_time, 'Dy, DD Mon YYYY HH24:MI:SS "GMT"') AS max_pickup_time,
+                active_pickup_zones,
+                active_dropoff_zones
+            FROM analytics_kpis LIMIT 1
+        ) k), '{}'),
+
+        -- 2) Payment mix
+        'payment_mix',
+        (SELECT COALESCE(json_agg(p ORDER BY p.trip_count DESC), '[]')
+         FROM (SELECT payment_type, trip_count FROM analytics_payment_mix) p),
+
+        -- 3) Trips by borough
+        'trips_by_borough',
+        (SELECT COALESCE(json_agg(b ORDER BY b.trip_count DESC), '[]')
+         FROM (SELECT borough, trip_count FROM analytics_trips_by_borough) b),
+
+        -- 4) Trips by weekday
+        'trips_by_weekday',
+        (SELECT COALESCE(json_agg(w ORDER BY w.weekday), '[]')
+         FROM (SELECT weekday, trip_count FROM analytics_trips_by_weekday) w),
+
+        -- 5) Trips by hour
+        'trips_by_hour',
+        (SELECT COALESCE(json_agg(h ORDER BY h.hour), '[]')
+         FROM (SELECT hour, trip_count FROM analytics_trips_by_hour) h)
+    )::text AS payload;
+""")
 
 
-# 1st Feature — Trip Analytics Dashboard (Materialized Views)
 @analytics_bp.route("/api/trip-analytics", methods=["GET"])
+@cached(timeout=600, key_prefix=TRIP_ANALYTICS_CACHE_KEY)
 def trip_analytics():
     start_time = time.time()
 
-    with engine.connect() as conn:
-        # 1) Global KPIs (single row)
-        kpis_row = conn.execute(
-            text("SELECT * FROM analytics_kpis LIMIT 1;")
-        ).mappings().first()
-
-        # 2) Payment mix
-        payment_rows = conn.execute(
-            text("""
-                SELECT payment_type, trip_count
-                FROM analytics_payment_mix
-                ORDER BY trip_count DESC;
-            """)
-        ).mappings().all()
-
-        # 3) Trips by borough
-        borough_rows = conn.execute(
-            text("""
-                SELECT borough, trip_count
-                FROM analytics_trips_by_borough
-                ORDER BY trip_count DESC;
-            """)
-        ).mappings().all()
-
-        # 4) Trips by weekday
-        weekday_rows = conn.execute(
-            text("""
-                SELECT weekday, trip_count
-                FROM analytics_trips_by_weekday
-                ORDER BY weekday;
-            """)
-        ).mappings().all()
-
-        # 5) Trips by hour
-        hour_rows = conn.execute(
-            text("""
-                SELECT hour, trip_count
-                FROM analytics_trips_by_hour
-                ORDER BY hour;
-            """)
-        ).mappings().all()
+    payload = get_conn().execute(TRIP_ANALYTICS_QUERY).scalar_one()
 
     elapsed = time.time() - start_time
 
-    # Convert rows dict/list for JSON
-    kpis = dict(kpis_row) if kpis_row is not None else {}
-
-    payment_mix = [dict(r) for r in payment_rows]
-    trips_by_borough = [dict(r) for r in borough_rows]
-    trips_by_weekday = [dict(r) for r in weekday_rows]
-    trips_by_hour = [dict(r) for r in hour_rows]
-
-    return jsonify({
-        "metadata": {
-            "execution_time_sec": round(elapsed, 3),
-            "data_source": "materialized_views",
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        },
-        "kpis": kpis,
-        "payment_mix": payment_mix,
-        "trips_by_borough": trips_by_borough,
-        "trips_by_weekday": trips_by_weekday,
-        "trips_by_hour": trips_by_hour,
+    metadata = current_app.json.dumps({
+        "execution_time_sec": round(elapsed, 3),
+        "data_source": "materialized_views",
+        "timestamp": timestamp(),
     })
 
+    # Splice metadata in front of the DB-built object: '{"kpis": ...}'
+    response = current_app.response_class(
+        '{"metadata":' + metadata + "," + payload[1:],
+        mimetype="application/json",
+    )
+    # ETag follows the MV contents only, so it changes exactly when a
+    # refresh changes the data (and matches across workers).
+    response.set_etag(hashlib.sha1(payload.encode()).hexdigest())
+    return response
+
 
 # Manual refresh of Analytics MVs
 
+ANALYTICS_MVS = (
+    "analytics_kpis",
+    "analytics_payment_mix",
+    "analytics_trips_by_borough",
+    # also backs the analytics_trips_by_weekday / _by_hour views
+    "analytics_trips_by_weekday_hour",
+    # unfiltered /api/map-density
+    "trip_zone_density",
+)
+
+
+def refresh_mv(name):
+    # CONCURRENTLY keeps the MV readable during refresh (needs the unique
+    # index created in create_view.py); each MV gets its own connection.
+    # A full-table refresh can outlast the API's statement_timeout, so lift
+    # it for this statement and restore it before the connection is pooled
+    # (SET LOCAL would be a no-op on the AUTOCOMMIT engine).
+    with engine.connect() as conn:
+        conn.execute(text("SET statement_timeout = 0;"))
+        try:
+            conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name};"))
+        finally:
+            conn.execute(text("RESET statement_timeout;"))
+
+
 @analytics_bp.route("/api/refresh-trip-analytics", methods=["POST"])
 def refresh_trip_analytics():
     start_time = time.time()
 
-    with engine.begin() as conn:
-        conn.execute(text("REFRESH MATERIALIZED VIEW analytics_kpis;"))
-        conn.execute(text("REFRESH MATERIALIZED VIEW analytics_payment_mix;"))
-        conn.execute(text("REFRESH MATERIALIZED VIEW analytics_trips_by_borough;"))
-        conn.execute(text("REFRESH MATERIALIZED VIEW analytics_trips_by_weekday;"))
-        conn.execute(text("REFRESH MATERIALIZED VIEW analytics_trips_by_hour;"))
+    with ThreadPoolExecutor(max_workers=len(ANALYTICS_MVS)) as executor:
+        list(executor.map(refresh_mv, ANALYTICS_MVS))
 
     elapsed = time.time() - start_time
 
+    # Drops the dashboard payload and the cached map-density responses,
+    # which are read from the refreshed MVs too
+    if cache:
+        cache.clear()
+
     return jsonify({
         "message": "✅ Analytics materialized views refreshed successfully.",
         "execution_time_sec": round(elapsed, 3),
-        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "timestamp": timestamp(),
     })
@@ -1,13 +1,33 @@
 from flask import Blueprint, request, jsonify
-from sqlalchemy import create_engine, text
-from app.config import Config
+from app.db import round_fields, compile_raw_query, fetch_binary
+from app.utils import timestamp
 import time
-import datetime
+from datetime import datetime
 
 fare_tip_bp = Blueprint("fare_tip", __name__)
 
-# Global DB connection
-engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+# Output precision for float aggregates
+ROUNDED = {"avg_fare": 2, "avg_tip": 2, "tip_to_fare_ratio": 3}
+
+BASE_QUERY = """
+    SELECT
+        pickup_weekday AS weekday,
+        pickup_hour AS hour,
+        p.payment_type,
+        AVG(t.fare) AS avg_fare,
+        AVG(t.tip_amount) AS avg_tip,
+        AVG(t.tip_amount) / NULLIF(AVG(t.fare), 0) AS tip_to_fare_ratio,
+        COUNT(*) AS trip_count
+    FROM public.trips t
+    LEFT JOIN public.payments p ON t.payment_id = p.payment_id
+    WHERE t.pickup_time IS NOT NULL
+"""
+
+# Group and order by time/payment
+GROUP_QUERY = """
+    GROUP BY pickup_weekday, pickup_hour, p.payment_type
+    ORDER BY pickup_weekday, pickup_hour, p.payment_type;
+"""
 
 
 @fare_tip_bp.route("/api/fare-tip-analysis", methods=["GET"])
@@ -16,23 +36,14 @@ def fare_tip_analysis():
     payment_id = request.args.get("payment_id", type=int)
     weekday = request.args.get("weekday", type=int)
     hour = request.args.get("hour", type=int)
-    start = request.args.get("start")
-    end = request.args.get("end")
-
-    # Build base query dynamically
-    base_query = """
-        SELECT
-            pickup_weekday AS weekday,
-            pickup_hour AS hour,
-            p.payment_type,
-            ROUND(AVG(t.fare)::numeric, 2) AS avg_fare,
-            ROUND(AVG(t.tip_amount)::numeric, 2) AS avg_tip,
-            ROUND((AVG(t.tip_amount) / NULLIF(AVG(t.fare), 0))::numeric, 3) AS tip_to_fare_ratio,
-            COUNT(*) AS trip_count
-        FROM public.trips t
-        LEFT JOIN public.payments p ON t.payment_id = p.payment_id
-        WHERE t.pickup_time IS NOT NULL
-    """
+    # Parsed here so they bind as timestamps, not text; a bad date is a 400
+    # rather than a silently dropped range
+    start, end = request.args.get("start"), request.args.get("end")
+    try:
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        return jsonify({"error": "invalid start/end date"}), 400
 
     filters = []
     params = {}
@@ -56,30 +67,24 @@ def fare_tip_analysis():
         filters.append("t.pickup_time < :end")
         params["end"] = end
 
-    if filters:
-        base_query += " AND " + " AND ".join(filters)
-
-    # Group and order by time/payment
-    base_query += """
-        GROUP BY pickup_weekday, pickup_hour, p.payment_type
-        ORDER BY pickup_weekday, pickup_hour, p.payment_type;
-    """
-
-    query = text(base_query)
+    query = compile_raw_query(BASE_QUERY, tuple(filters), GROUP_QUERY)
 
     start_time = time.time()
-    with engine.connect() as conn:
-        rows = conn.execute(query, params).fetchall()
+    columns, rows = fetch_binary(query, params)
+    data = [dict(zip(columns, row)) for row in rows]
     elapsed = time.time() - start_time
 
-    data = [dict(row._mapping) for row in rows]
+    round_fields(data, ROUNDED)
 
     return jsonify({
         "metadata": {
             "row_count": len(data),
-            "filters": {k: v for k, v in params.items()},
+            "filters": {
+                k: request.args[k] if k in ("start", "end") else v
+                for k, v in params.items()
+            },
             "execution_time_sec": round(elapsed, 3),
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "timestamp": timestamp()
         },
         "data": data
     })
@@ -1,21 +1,70 @@
 from flask import Blueprint, jsonify, request
-from sqlalchemy import create_engine, text
-from app.config import Config
-import time, datetime
+from functools import lru_cache
+from app.db import run_query, compile_raw_query, fetch_binary
+from app.utils import timestamp
+from app.cache import cached, http_cacheable
+import time
+from datetime import datetime
 
 map_bp = Blueprint("map_view", __name__)
-engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+map_bp.after_request(http_cacheable)
+
+# Zone-based density query, split around the optional filters, per zone column.
+# Zone names are attached in Python from zone_lookup() rather than joined.
+MAP_QUERIES = {
+    qtype: (
+        f"""
+        SELECT
+            t.{zone_col} AS zone_id,
+            COUNT(*)::bigint AS trip_count
+        FROM public.trips t
+        WHERE t.pickup_time IS NOT NULL
+        """,
+        f"""
+        GROUP BY t.{zone_col}
+        ORDER BY trip_count DESC
+        LIMIT :limit;
+        """,
+    )
+    for qtype, zone_col in (("pickup", "pickup_zone_id"), ("dropoff", "dropoff_zone_id"))
+}
+
+
+# Unfiltered density comes from the trip_zone_density MV (create_view.py):
+# pickup totals are stored directly, dropoff totals sum its O-D pair rows.
+MAP_MV_QUERIES = {
+    "pickup": """
+        SELECT pickup_zone_id AS zone_id, trip_count
+        FROM public.trip_zone_density
+        WHERE is_pickup_total = 1
+        ORDER BY trip_count DESC
+        LIMIT %(limit)s;
+    """,
+    "dropoff": """
+        SELECT dropoff_zone_id AS zone_id, SUM(trip_count)::bigint AS trip_count
+        FROM public.trip_zone_density
+        WHERE is_pickup_total = 0
+        GROUP BY dropoff_zone_id
+        ORDER BY trip_count DESC
+        LIMIT %(limit)s;
+    """,
+}
+
+
+@lru_cache(maxsize=1)
+def zone_lookup():
+    """zone_id -> (borough, zone_name); the ~265-row zones table is static."""
+    rows = run_query("SELECT zone_id, borough, zone_name FROM public.zones;")
+    return {r["zone_id"]: (r["borough"], r["zone_name"]) for r in rows}
 
 
 @map_bp.route("/api/map-density", methods=["GET"])
+@cached(timeout=600, query_string=True)
 def map_density():
     qtype = request.args.get("type", "pickup").lower()
     if qtype not in ("pickup", "dropoff"):
         return jsonify({"error": "type must be 'pickup' or 'dropoff'"}), 400
 
-    # Which zone column to use
-    zone_col = "pickup_zone_id" if qtype == "pickup" else "dropoff_zone_id"
-
     # Limit for top-N busiest zones
     try:
         limit = int(request.args.get("limit", 150))
@@ -26,20 +75,24 @@ def map_density():
     where, params = [], {}
 
     # Standard filters (same pattern as other endpoints)
-    for key, col in [
-        ("weekday", "t.pickup_weekday"),
-        ("hour", "t.pickup_hour"),
-        ("vendor_id", "t.vendor_id"),
-        ("payment_id", "t.payment_id"),
+    for key, col, typ in [
+        ("weekday", "t.pickup_weekday", int),
+        ("hour", "t.pickup_hour", int),
+        ("vendor_id", "t.vendor_id", str),
+        ("payment_id", "t.payment_id", int),
     ]:
-        val = request.args.get(key)
+        val = request.args.get(key, type=typ)
         if val is not None and val != "":
             where.append(f"{col} = :{key}")
             params[key] = val
 
-    # Date range filters on pickup_time
-    start = request.args.get("start")
-    end = request.args.get("end")
+    # Date range filters on pickup_time, bound as timestamps
+    start, end = request.args.get("start"), request.args.get("end")
+    try:
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        return jsonify({"error": "invalid start/end date"}), 400
     if start:
         where.append("t.pickup_time >= :start")
         params["start"] = start
@@ -47,45 +100,46 @@ def map_density():
         where.append("t.pickup_time < :end")
         params["end"] = end
 
-    where_sql = "WHERE " + " AND ".join(where) if where else ""
-
-    # Zone-based density query
-    query = text(f"""
-        SELECT
-            t.{zone_col} AS zone_id,
-            z.borough,
-            z.zone_name,
-            COUNT(*)::bigint AS trip_count
-        FROM public.trips t
-        LEFT JOIN public.zones z
-            ON t.{zone_col} = z.zone_id
-        {where_sql}
-        GROUP BY t.{zone_col}, z.borough, z.zone_name
-        ORDER BY trip_count DESC
-        LIMIT :limit;
-    """)
+    if where:
+        head, tail = MAP_QUERIES[qtype]
+        query = compile_raw_query(head, tuple(where), tail)
+    else:
+        query = MAP_MV_QUERIES[qtype]
 
     params["limit"] = limit
 
     start_time = time.time()
-    with engine.connect() as conn:
-        rows = conn.execute(query, params).fetchall()
+    _, rows = fetch_binary(query, params)
     elapsed = time.time() - start_time
 
-    data = [dict(row._mapping) for row in rows]
+    zones = zone_lookup()
+    if not zones:
+        # zones not loaded yet; re-read it on the next request (every
+        # non-NULL zone id is FK-checked, so a loaded table is complete)
+        zone_lookup.cache_clear()
+    data = []
+    for zone_id, trip_count in rows:
+        borough, zone_name = zones.get(zone_id, (None, None))
+        data.append({
+            "zone_id": zone_id,
+            "borough": borough,
+            "zone_name": zone_name,
+            "trip_count": trip_count,
+        })
 
     return jsonify({
         "metadata": {
             "rows": len(data),
             "type": qtype,
             "limit": limit,
+            # Echo the query-string values as sent, not the parsed binds
             "filters": {
-                k: v
-                for k, v in params.items()
+                k: request.args[k]
+                for k in params
                 if k in ("weekday", "hour", "vendor_id", "payment_id", "start", "end")
             },
             "execution_time_sec": round(elapsed, 3),
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": timestamp(),
         },
         "data": data,
     })
@@ -1,13 +1,32 @@
 from flask import Blueprint, request, jsonify
-from sqlalchemy import create_engine, text
-from app.config import Config
+from app.db import get_conn, round_fields, compile_query
+from app.utils import timestamp
 import time
-import datetime
+from datetime import datetime
 
 peak_bp = Blueprint("peak_hours", __name__)
 
-# Global DB engine
-engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+# Output precision for float aggregates
+ROUNDED = {"avg_fare": 2, "avg_distance": 2, "avg_duration_min": 2}
+
+BASE_QUERY = """
+    SELECT
+        pickup_weekday AS weekday,
+        pickup_hour AS hour,
+        COUNT(*) AS trip_count,
+        AVG(fare) AS avg_fare,
+        AVG(distance) AS avg_distance,
+        AVG(trip_duration_min) AS avg_duration_min
+    FROM public.trips
+    WHERE pickup_time IS NOT NULL
+"""
+
+# Group, order, and limit
+GROUP_QUERY = """
+    GROUP BY pickup_weekday, pickup_hour
+    ORDER BY trip_count DESC
+    LIMIT 10;
+"""
 
 
 @peak_bp.route("/api/peak-hours", methods=["GET"])
@@ -15,21 +34,14 @@ def peak_hours():
 
     vendor_id = request.args.get("vendor_id")
     payment_id = request.args.get("payment_id", type=int)
-    start = request.args.get("start")
-    end = request.args.get("end")
-
-    base_query = """
-        SELECT
-            pickup_weekday AS weekday,
-            pickup_hour AS hour,
-            COUNT(*) AS trip_count,
-            ROUND(AVG(fare)::numeric, 2) AS avg_fare,
-            ROUND(AVG(distance)::numeric, 2) AS avg_distance,
-            ROUND(AVG(EXTRACT(EPOCH FROM (dropoff_time - pickup_time)) / 60)::numeric, 2)
-                AS avg_duration_min
-        FROM public.trips
-        WHERE pickup_time IS NOT NULL
-    """
+    # Parsed here so they bind as timestamps, not text; a bad date is a 400
+    # rather than a silently dropped range
+    start, end = request.args.get("start"), request.args.get("end")
+    try:
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        return jsonify({"error": "invalid start/end date"}), 400
 
     filters = []
     params = {}
@@ -47,31 +59,23 @@ def peak_hours():
         filters.append("pickup_time < :end")
         params["end"] = end
 
-    if filters:
-        base_query += " AND " + " AND ".join(filters)
-
-    # Group, order, and limit
-    base_query += """
-        GROUP BY pickup_weekday, pickup_hour
-        ORDER BY trip_count DESC
-        LIMIT 10;
-    """
-
-    query = text(base_query)
+    query = compile_query(BASE_QUERY, tuple(filters), GROUP_QUERY)
 
     start_time = time.time()
-    with engine.connect() as conn:
-        rows = conn.execute(query, params).fetchall()
+    data = [dict(row) for row in get_conn().execute(query, params).mappings()]
     elapsed = time.time() - start_time
 
-    data = [dict(row._mapping) for row in rows]
+    round_fields(data, ROUNDED)
 
     return jsonify({
         "metadata": {
             "row_count": len(data),
-            "filters": {k: v for k, v in params.items()},
+            "filters": {
+                k: request.args[k] if k in ("start", "end") else v
+                for k, v in params.items()
+            },
             "execution_time_sec": round(elapsed, 3),
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "timestamp": timestamp()
         },
         "data": data
     })
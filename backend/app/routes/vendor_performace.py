@@ -1,13 +1,32 @@
 from flask import Blueprint, request, jsonify
-from sqlalchemy import create_engine, text
-from app.config import Config
+from app.db import get_conn, round_fields, compile_query
+from app.utils import timestamp
 import time
-import datetime
+from datetime import datetime
 
 vendor_bp = Blueprint("vendor_performance", __name__)
 
-# Global DB engine
-engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+# Output precision for float aggregates
+ROUNDED = {"avg_fare": 2, "avg_tip": 2, "avg_distance": 2, "total_revenue": 2}
+
+BASE_QUERY = """
+    SELECT
+        v.vendor_id,
+        v.name AS vendor_name,
+        AVG(t.fare) AS avg_fare,
+        AVG(t.tip_amount) AS avg_tip,
+        AVG(t.distance) AS avg_distance,
+        SUM(t.total_amount) AS total_revenue,
+        COUNT(*) AS trip_count
+    FROM public.trips t
+    JOIN public.vendors v ON t.vendor_id = v.vendor_id
+    WHERE t.pickup_time IS NOT NULL
+"""
+
+GROUP_QUERY = """
+    GROUP BY v.vendor_id, v.name
+    ORDER BY total_revenue DESC;
+"""
 
 
 @vendor_bp.route("/api/vendor-performance", methods=["GET"])
@@ -15,22 +34,14 @@ def vendor_performance():
     payment_id = request.args.get("payment_id", type=int)
     weekday = request.args.get("weekday", type=int)
     hour = request.args.get("hour", type=int)
-    start = request.args.get("start")
-    end = request.args.get("end")
-
-    base_query = """
-        SELECT
-            v.vendor_id,
-            v.name AS vendor_name,
-            ROUND(AVG(t.fare)::numeric, 2) AS avg_fare,
-            ROUND(AVG(t.tip_amount)::numeric, 2) AS avg_tip,
-            ROUND(AVG(t.distance)::numeric, 2) AS avg_distance,
-            ROUND(SUM(t.total_amount)::numeric, 2) AS total_revenue,
-            COUNT(*) AS trip_count
-        FROM public.trips t
-        JOIN public.vendors v ON t.vendor_id = v.vendor_id
-        WHERE t.pickup_time IS NOT NULL
-    """
+    # Parsed here so they bind as timestamps, not text; a bad date is a 400
+    # rather than a silently dropped range
+    start, end = request.args.get("start"), request.args.get("end")
+    try:
+        start = datetime.fromisoformat(start) if start else None
+        end = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        return jsonify({"error": "invalid start/end date"}), 400
 
     filters = []
     params = {}
@@ -51,29 +62,23 @@ def vendor_performance():
         filters.append("t.pickup_time < :end")
         params["end"] = end
 
-    if filters:
-        base_query += " AND " + " AND ".join(filters)
-
-    base_query += """
-        GROUP BY v.vendor_id, v.name
-        ORDER BY total_revenue DESC;
-    """
-
-    query = text(base_query)
+    query = compile_query(BASE_QUERY, tuple(filters), GROUP_QUERY)
 
     start_time = time.time()
-    with engine.connect() as conn:
-        rows = conn.execute(query, params).fetchall()
+    data = [dict(row) for row in get_conn().execute(query, params).mappings()]
     elapsed = time.time() - start_time
 
-    data = [dict(row._mapping) for row in rows]
+    round_fields(data, ROUNDED)
 
     return jsonify({
         "metadata": {
             "row_count": len(data),
-            "filters": {k: v for k, v in params.items()},
+            "filters": {
+                k: request.args[k] if k in ("start", "end") else v
+                for k, v in params.items()
+            },
             "execution_time_sec": round(elapsed, 3),
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "timestamp": timestamp()
         },
         "data": data
     })
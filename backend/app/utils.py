@@ -0,0 +1,16 @@
+import time
+
+
+_last_timestamp = (0, "")
+
+
+def timestamp():
+    """Local time as 'YYYY-MM-DD HH:MM:SS' for response metadata.
+
+    Formatted at most once per second and shared across requests.
+    """
+    global _last_timestamp
+    now = int(time.time())
+    if now != _last_timestamp[0]:
+        _last_timestamp = (now, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)))
+    return _last_timestamp[1]
@@ -4,8 +4,11 @@ Create only the materialized views required for the Analytics Dashboard.
 """
 
 import os
+import sys
 import getpass
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,6 +20,9 @@ PGPORT = os.environ.get("PGPORT", "5432")
 DB_NAME = os.environ.get("DB_NAME", "nyc_taxi")
 SCHEMA_NAME = os.environ.get("SCHEMA_NAME", "public")
 
+# Parallel seq scan + partial aggregate for each MV build / refresh
+MV_PARALLEL_WORKERS = int(os.environ.get("MV_PARALLEL_WORKERS", "8"))
+
 
 def make_url(db):
     if PGPASSWORD:
@@ -24,83 +30,204 @@ def make_url(db):
     return f"postgresql+psycopg2://{PGUSER}@{PGHOST}:{PGPORT}/{db}"
 
 
-def recreate_analytics_mvs():
-    engine = create_engine(make_url(DB_NAME))
+# name -> (SELECT body, unique index columns for REFRESH ... CONCURRENTLY,
+#          INCLUDE columns so readers get index-only scans, or None)
+ANALYTICS_MVS = {
+    # 1. Global KPIs (single row; any unique index will do)
+    "analytics_kpis": ("""
+        SELECT
+            COUNT(*)::bigint                             AS total_trips,
+            ROUND(SUM(total_amount)::numeric, 2)         AS total_revenue,
+            ROUND(AVG(fare)::numeric, 2)                 AS avg_fare,
+            ROUND(AVG(distance)::numeric, 2)             AS avg_distance,
+            ROUND(AVG(trip_duration_min)::numeric, 2)    AS avg_duration_min,
+            MIN(pickup_time)                             AS min_pickup_time,
+            MAX(pickup_time)                             AS max_pickup_time,
+            COUNT(DISTINCT pickup_zone_id)               AS active_pickup_zones,
+            COUNT(DISTINCT dropoff_zone_id)              AS active_dropoff_zones
+        FROM trips
+    """, "total_trips", None),
+
+    # 2. Payment mix
+    "analytics_payment_mix": ("""
+        SELECT
+            p.payment_type,
+            COUNT(*)::bigint AS trip_count
+        FROM trips t
+        LEFT JOIN payments p ON t.payment_id = p.payment_id
+        GROUP BY p.payment_type
+        ORDER BY trip_count DESC
+    """, "payment_type", "trip_count"),
+
+    # 3. Trips by borough
+    "analytics_trips_by_borough": ("""
+        SELECT
+            z.borough,
+            COUNT(*)::bigint AS trip_count
+        FROM trips t
+        LEFT JOIN zones z ON t.pickup_zone_id = z.zone_id
+        GROUP BY z.borough
+        ORDER BY trip_count DESC
+    """, "borough", "trip_count"),
+
+    # 4+5. Trips by weekday and by hour: both marginals from one scan of
+    #      trips via GROUPING SETS; is_weekday_total = 1 marks the weekday
+    #      rows (hour NULL), 0 the hour rows. bucket is the non-NULL one of
+    #      the two, so the unique key has no NULLs and REFRESH CONCURRENTLY
+    #      can match rows. Exposed as the two plain views in ANALYTICS_VIEWS
+    "analytics_trips_by_weekday_hour": ("""
+        SELECT
+            pickup_weekday AS weekday,
+            pickup_hour AS hour,
+            GROUPING(pickup_hour) AS is_weekday_total,
+            COALESCE(pickup_weekday, pickup_hour) AS bucket,
+            COUNT(*)::bigint AS trip_count
+        FROM trips
+        GROUP BY GROUPING SETS ((pickup_weekday), (pickup_hour))
+    """, "is_weekday_total, bucket", "trip_count"),
+
+    # 6. Zone density: per-pickup-zone totals (is_pickup_total = 1) and
+    #    origin-destination pair counts from one scan via GROUPING SETS.
+    #    The *_key columns are the zone ids with NULL as 0 (zone ids start
+    #    at 1), giving the unique key no NULLs so REFRESH CONCURRENTLY can
+    #    match rows
+    "trip_zone_density": ("""
+        SELECT
+            pickup_zone_id,
+            dropoff_zone_id,
+            GROUPING(dropoff_zone_id) AS is_pickup_total,
+            COALESCE(pickup_zone_id, 0) AS pickup_key,
+            COALESCE(dropoff_zone_id, 0) AS dropoff_key,
+            COUNT(*)::bigint AS trip_count
+        FROM trips
+        GROUP BY GROUPING SETS ((pickup_zone_id), (pickup_zone_id, dropoff_zone_id))
+    """, "is_pickup_total, pickup_key, dropoff_key", "trip_count"),
+}
+
+
+def set_mv_session(conn):
+    conn.execute(text(f'SET search_path TO "{SCHEMA_NAME}", public'))
+    conn.execute(text(f"SET LOCAL max_parallel_workers_per_gather = {MV_PARALLEL_WORKERS}"))
+    conn.execute(text("SET LOCAL parallel_setup_cost = 0"))
+
+
+# Plain views over the MVs above, keeping the names the API reads
+ANALYTICS_VIEWS = {
+    "analytics_trips_by_weekday": """
+        SELECT weekday, trip_count
+        FROM analytics_trips_by_weekday_hour
+        WHERE is_weekday_total = 1
+    """,
+    "analytics_trips_by_hour": """
+        SELECT hour, trip_count
+        FROM analytics_trips_by_weekday_hour
+        WHERE is_weekday_total = 0
+    """,
+}
+
+
+# Suffix of the copies define_mvs builds next to the live MVs
+STAGING_SUFFIX = "_staging"
+
+
+def define_mvs(engine):
+    # DDL only: every view gets an empty (WITH NO DATA) staging copy with its
+    # unique index in one short transaction; populate_mv fills the copies
+    # and swap_mvs puts them in place, so the live MVs stay readable
+    with engine.begin() as conn:
+        conn.execute(text(f'SET search_path TO "{SCHEMA_NAME}", public'))
+
+        for name, (select_sql, unique_cols, include_cols) in ANALYTICS_MVS.items():
+            staged = name + STAGING_SUFFIX
+            include = f" INCLUDE ({include_cols})" if include_cols else ""
+            conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {staged};"))
+            conn.execute(text(f"CREATE MATERIALIZED VIEW {staged} AS {select_sql} WITH NO DATA;"))
+            conn.execute(text(f"CREATE UNIQUE INDEX ux_{staged} ON {staged} ({unique_cols}){include};"))
+
+
+def populate_mv(engine, name):
+    # First fill of an unpopulated staging copy; CONCURRENTLY is not allowed here
+    staged = name + STAGING_SUFFIX
+    with engine.begin() as conn:
+        set_mv_session(conn)
+        conn.execute(text(f"REFRESH MATERIALIZED VIEW {staged};"))
+        # Fresh stats so the planner can pick the covering index
+        conn.execute(text(f"ANALYZE {staged};"))
+    print(f"   ✅ {name}")
+
+
+def swap_mvs(engine):
+    # Replace the live MVs with the filled copies in one transaction; readers
+    # only wait on the lock for the renames, never see an unpopulated view
     with engine.begin() as conn:
         conn.execute(text(f'SET search_path TO "{SCHEMA_NAME}", public'))
 
-        # 1. Global KPIs
-        conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS analytics_kpis CASCADE;"))
-        conn.execute(text("""
-            CREATE MATERIALIZED VIEW analytics_kpis AS
-            SELECT
-                COUNT(*)::bigint                             AS total_trips,
-                ROUND(SUM(total_amount)::numeric, 2)         AS total_revenue,
-                ROUND(AVG(fare)::numeric, 2)                 AS avg_fare,
-                ROUND(AVG(distance)::numeric, 2)             AS avg_distance,
-                ROUND(AVG(trip_duration_min)::numeric, 2)    AS avg_duration_min,
-                MIN(pickup_time)                             AS min_pickup_time,
-                MAX(pickup_time)                             AS max_pickup_time,
-                COUNT(DISTINCT pickup_zone_id)               AS active_pickup_zones,
-                COUNT(DISTINCT dropoff_zone_id)              AS active_dropoff_zones
-            FROM trips;
-        """))
-
-        # 2. Payment mix
-        conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS analytics_payment_mix CASCADE;"))
-        conn.execute(text("""
-            CREATE MATERIALIZED VIEW analytics_payment_mix AS
-            SELECT
-                p.payment_type,
-                COUNT(*)::bigint AS trip_count
-            FROM trips t
-            LEFT JOIN payments p ON t.payment_id = p.payment_id
-            GROUP BY p.payment_type
-            ORDER BY trip_count DESC;
-        """))
-
-        # 3. Trips by borough
-        conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS analytics_trips_by_borough CASCADE;"))
-        conn.execute(text("""
-            CREATE MATERIALIZED VIEW analytics_trips_by_borough AS
-            SELECT
-                z.borough,
-                COUNT(*)::bigint AS trip_count
-            FROM trips t
-            LEFT JOIN zones z ON t.pickup_zone_id = z.zone_id
-            GROUP BY z.borough
-            ORDER BY trip_count DESC;
-        """))
-
-        # 4. Trips by weekday
-        conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS analytics_trips_by_weekday CASCADE;"))
-        conn.execute(text("""
-            CREATE MATERIALIZED VIEW analytics_trips_by_weekday AS
-            SELECT
-                pickup_weekday AS weekday,
-                COUNT(*)::bigint AS trip_count
-            FROM trips
-            GROUP BY pickup_weekday
-            ORDER BY weekday;
-        """))
-
-        # 5. Trips by hour
-        conn.execute(text("DROP MATERIALIZED VIEW IF EXISTS analytics_trips_by_hour CASCADE;"))
-        conn.execute(text("""
-            CREATE MATERIALIZED VIEW analytics_trips_by_hour AS
-            SELECT
-                pickup_hour AS hour,
-                COUNT(*)::bigint AS trip_count
-            FROM trips
-            GROUP BY pickup_hour
-            ORDER BY hour;
-        """))
+        # Older builds made the ANALYTICS_VIEWS names materialized views
+        legacy = conn.execute(
+            text("SELECT matviewname FROM pg_matviews WHERE schemaname = :schema AND matviewname = ANY(:names)"),
+            {"schema": SCHEMA_NAME, "names": list(ANALYTICS_VIEWS)},
+        ).scalars().all()
+        for name in legacy:
+            conn.execute(text(f"DROP MATERIALIZED VIEW {name} CASCADE;"))
+
+        for name in ANALYTICS_MVS:
+            staged = name + STAGING_SUFFIX
+            conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {name} CASCADE;"))
+            conn.execute(text(f"ALTER MATERIALIZED VIEW {staged} RENAME TO {name};"))
+            conn.execute(text(f"ALTER INDEX ux_{staged} RENAME TO ux_{name};"))
+
+        for name, select_sql in ANALYTICS_VIEWS.items():
+            conn.execute(text(f"CREATE OR REPLACE VIEW {name} AS {select_sql};"))
+
+
+def refresh_mv(engine, name):
+    # Needs the ux_ index from define_mvs; readers are not blocked
+    with engine.begin() as conn:
+        set_mv_session(conn)
+        conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name};"))
+    print(f"   🔄 {name}")
+
+
+def make_engine():
+    # One connection per worker for the script's lifetime; nothing to pool
+    return create_engine(
+        make_url(DB_NAME),
+        poolclass=NullPool,
+        connect_args={"application_name": "taxi_setup"},
+    )
+
+
+def run_on_all_mvs(engine, fn):
+    # The MVs are independent full scans of trips, so fill them side by
+    # side, each in its own transaction on its own connection; the scans
+    # also share trips pages in shared_buffers.
+    with ThreadPoolExecutor(max_workers=len(ANALYTICS_MVS)) as executor:
+        futures = [executor.submit(fn, engine, name) for name in ANALYTICS_MVS]
+        for future in futures:
+            future.result()
+
+
+def recreate_analytics_mvs():
+    engine = make_engine()
+    define_mvs(engine)
+    run_on_all_mvs(engine, populate_mv)
+    swap_mvs(engine)
+    engine.dispose()
+
 
+def refresh_analytics_mvs():
+    engine = make_engine()
+    run_on_all_mvs(engine, refresh_mv)
     engine.dispose()
 
 
 if __name__ == "__main__":
-    print("🔌 Creating Analytics Materialized Views...")
-    recreate_analytics_mvs()
-    print("✅ Analytics MVs created successfully.")
+    if "--refresh" in sys.argv[1:]:
+        print("🔌 Refreshing Analytics Materialized Views...")
+        refresh_analytics_mvs()
+        print("✅ Analytics MVs refreshed successfully.")
+    else:
+        print("🔌 Creating Analytics Materialized Views...")
+        recreate_analytics_mvs()
+        print("✅ Analytics MVs created successfully.")
 
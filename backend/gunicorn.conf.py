@@ -0,0 +1,7 @@
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5001")
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+worker_class = "gevent"
+# Concurrent requests per worker (bounded in practice by DB_POOL_SIZE + DB_MAX_OVERFLOW)
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "200"))
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 import os
 import getpass
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,6 +15,10 @@ PGPORT = os.environ.get("PGPORT", "5432")
 DB_NAME = os.environ.get("DB_NAME", "nyc_taxi")
 SCHEMA_NAME = os.environ.get("SCHEMA_NAME", "public")
 
+# Memory / parallelism for the CREATE INDEX builds in this session only
+INDEX_MAINTENANCE_WORK_MEM = os.environ.get("INDEX_MAINTENANCE_WORK_MEM", "2GB")
+INDEX_PARALLEL_WORKERS = int(os.environ.get("INDEX_PARALLEL_WORKERS", "4"))
+
 
 def make_url(db_name: str) -> str:
     if PGPASSWORD:
@@ -20,85 +26,91 @@ def make_url(db_name: str) -> str:
     return f"postgresql+psycopg2://{PGUSER}@{PGHOST}:{PGPORT}/{db_name}"
 
 
+# Covering indexes: INCLUDE the columns the API aggregates / filters on
+# so fare-tip, peak-hours, vendor and map queries can use index-only
+# scans. They supersede the older single-key indexes in OLD_TRIPS_INDEXES.
+# idx_trips_pickup_time (btree) is replaced by the BRIN index.
+OLD_TRIPS_INDEXES = ("idx_trips_weekday_hour", "idx_trips_pickup_zone",
+                     "idx_trips_dropoff_zone", "idx_trips_vendor",
+                     "idx_trips_pickup_time")
+
+# name -> (method, key columns, INCLUDE columns, WITH options)
+TRIPS_INDEXES = {
+    "idx_trips_weekday_hour_cover": (
+        "btree", "pickup_weekday, pickup_hour",
+        "fare, tip_amount, distance, total_amount, trip_duration_min, vendor_id, payment_id",
+        None,
+    ),
+    # Rows are loaded month by month in roughly pickup order, so a BRIN
+    # index serves the start/end range filters at a tiny fraction of a
+    # btree's size.
+    "idx_trips_pickup_time_brin": ("brin", "pickup_time", None, "pages_per_range = 32"),
+    "idx_trips_pickup_zone_cover": (
+        "btree", "pickup_zone_id", "vendor_id, payment_id, pickup_weekday, pickup_hour", None,
+    ),
+    "idx_trips_dropoff_zone_cover": (
+        "btree", "dropoff_zone_id", "vendor_id, payment_id, pickup_weekday, pickup_hour", None,
+    ),
+    "idx_trips_payment": ("btree", "payment_id", None, None),
+    "idx_trips_vendor_payment": ("btree", "vendor_id, payment_id", None, None),
+    # Optional but nice for zone flows (pickup → dropoff combos)
+    "idx_trips_zone_pair": ("btree", "pickup_zone_id, dropoff_zone_id", None, None),
+}
+
+INDEX_BUILD_THREADS = int(os.environ.get("INDEX_BUILD_THREADS", "4"))
+
+
+def set_index_session(conn):
+    conn.execute(text(f'SET search_path TO "{SCHEMA_NAME}", public'))
+    conn.execute(text(f"SET maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'"))
+    conn.execute(text(f"SET max_parallel_maintenance_workers = {INDEX_PARALLEL_WORKERS}"))
+
+
+def build_index(engine, name):
+    method, cols, include, options = TRIPS_INDEXES[name]
+    ddl = f'CREATE INDEX IF NOT EXISTS {name} ON "{SCHEMA_NAME}".trips USING {method} ({cols})'
+    if include:
+        ddl += f" INCLUDE ({include})"
+    if options:
+        ddl += f" WITH ({options})"
+
+    with engine.connect() as conn:
+        set_index_session(conn)
+        conn.execute(text(ddl))
+    print(f"   ✅ {name}")
+
+
 def create_indexes():
-    engine = create_engine(make_url(DB_NAME))
-
-    with engine.begin() as conn:
-        conn.execute(text(f'SET search_path TO "{SCHEMA_NAME}", public'))
-
-        # =========================
-        # Base table: trips
-        # =========================
-        print("🧱 Creating core indexes on trips...")
-
-        conn.execute(text(f"""
-            CREATE INDEX IF NOT EXISTS idx_trips_weekday_hour
-            ON "{SCHEMA_NAME}".trips (pickup_weekday, pickup_hour);
-        """))
-
-        conn.execute(text(f"""
-            CREATE INDEX IF NOT EXISTS idx_trips_pickup_time
-            ON "{SCHEMA_NAME}".trips (pickup_time);
-        """))
-
-        conn.execute(text(f"""
-            CREATE INDEX IF NOT EXISTS idx_trips_pickup_zone
-            ON "{SCHEMA_NAME}".trips (pickup_zone_id);
-        """))
-
-        conn.execute(text(f"""
-            CREATE INDEX IF NOT EXISTS idx_trips_dropoff_zone
-            ON "{SCHEMA_NAME}".trips (dropoff_zone_id);
-        """))
-
-        conn.execute(text(f"""
-            CREATE INDEX IF NOT EXISTS idx_trips_payment
-            ON "{SCHEMA_NAME}".trips (payment_id);
-        """))
-
-        conn.execute(text(f"""
-            CREATE INDEX IF NOT EXISTS idx_trips_vendor
-            ON "{SCHEMA_NAME}".trips (vendor_id);
-        """))
-
-        # Optional but nice for zone flows (pickup → dropoff combos)
-        conn.execute(text(f"""
-            CREATE INDEX IF NOT EXISTS idx_trips_zone_pair
-            ON "{SCHEMA_NAME}".trips (pickup_zone_id, dropoff_zone_id);
-        """))
-
-        print("✅ Base indexes on trips created.\n")
-
-        # =========================
-        # Analytics MVs
-        # =========================
-        print("📊 Creating indexes on analytics materialized views...")
-
-        # analytics_payment_mix(payment_type)
-        conn.execute(text(f"""
-            CREATE INDEX IF NOT EXISTS idx_analytics_payment_mix_payment_type
-            ON "{SCHEMA_NAME}".analytics_payment_mix (payment_type);
-        """))
-
-        # analytics_trips_by_borough(borough)
-        conn.execute(text(f"""
-            CREATE INDEX IF NOT EXISTS idx_analytics_trips_by_borough_borough
-            ON "{SCHEMA_NAME}".analytics_trips_by_borough (borough);
-        """))
-
-        # analytics_trips_by_weekday(weekday)
-        conn.execute(text(f"""
-            CREATE INDEX IF NOT EXISTS idx_analytics_trips_by_weekday_weekday
-            ON "{SCHEMA_NAME}".analytics_trips_by_weekday (weekday);
-        """))
-
-        # analytics_trips_by_hour(hour)
-        conn.execute(text(f"""
-            CREATE INDEX IF NOT EXISTS idx_analytics_trips_by_hour_hour
-            ON "{SCHEMA_NAME}".analytics_trips_by_hour (hour);
-        """))
-
-        print("✅ Analytics MV indexes created.\n")
+    # One-shot DDL script: no pool, and autocommit so each index build is its
+    # own short transaction instead of one long one holding back vacuum
+    engine = create_engine(
+        make_url(DB_NAME),
+        poolclass=NullPool,
+        isolation_level="AUTOCOMMIT",
+        connect_args={"application_name": "taxi_setup"},
+    )
+
+    # =========================
+    # Base table: trips
+    # =========================
+    print("🧱 Creating core indexes on trips...")
+
+    with engine.connect() as conn:
+        for old_idx in OLD_TRIPS_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{SCHEMA_NAME}".{old_idx};'))
+
+    # Plain CREATE INDEX only takes a SHARE lock, so builds on separate
+    # connections run side by side and share the cached heap pages.
+    # (CONCURRENTLY is not available on a partitioned table.)
+    with ThreadPoolExecutor(max_workers=INDEX_BUILD_THREADS) as executor:
+        futures = [executor.submit(build_index, engine, name) for name in TRIPS_INDEXES]
+        for future in futures:
+            future.result()
+
+    print("✅ Base indexes on trips created.\n")
+
+    # Analytics MVs get their unique indexes (needed for
+    # REFRESH MATERIALIZED VIEW CONCURRENTLY) in create_view.py.
 
     engine.dispose()
 
@@ -1,14 +1,35 @@
 #!/usr/bin/env python3
+import io
+import logging
+import math
 import os
+import re
 import sys
 import getpass
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, text
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from psycopg2.extras import execute_values
+from sqlalchemy import create_engine, event, text
 from dotenv import load_dotenv
 
+# Optional binary COPY encoder (falls back to CSV COPY)
+try:
+    from pgpq import ArrowToPostgresBinaryEncoder
+except ImportError:
+    ArrowToPostgresBinaryEncoder = None
+
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
+# Per-batch progress goes to log.info every N batches (LOG_LEVEL=INFO to see it)
+PROGRESS_EVERY = 10
+
 # Config
 PGUSER = os.environ.get("PGUSER") or getpass.getuser()
 PGPASSWORD = os.environ.get("PGPASSWORD") 
@@ -35,6 +56,25 @@ PARQUET_FILES = [
 
 DROP_OLD_TRIPS = True
 
+# Some managed Postgres services restrict COPY; LOAD_USE_COPY=0 falls back to
+# batched INSERTs via execute_values
+USE_COPY = os.environ.get("LOAD_USE_COPY", "1") != "0"
+
+# Rows per parquet batch / COPY stream. Larger batches amortize per-batch
+# overhead; each worker holds about two batches in memory at once.
+LOAD_BATCH_ROWS = int(os.environ.get("LOAD_BATCH_ROWS", "200000"))
+
+# Parallel file loaders; each holds one connection for its COPY stream
+LOAD_WORKERS = int(os.environ.get("LOAD_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+# Per-session settings for loader connections. The load is an idempotent
+# reload, so losing the last few commits on a crash is acceptable.
+LOAD_SESSION_SETTINGS = {
+    "synchronous_commit": "off",
+    "maintenance_work_mem": os.environ.get("LOAD_MAINTENANCE_WORK_MEM", "1GB"),
+}
+
 
 def make_url(db_name: str) -> str:
     """Build SQLAlchemy URL."""
@@ -43,6 +83,19 @@ def make_url(db_name: str) -> str:
     return f"postgresql+psycopg2://{PGUSER}@{PGHOST}:{PGPORT}/{db_name}"
 
 
+def set_load_gucs(dbapi_conn, _record):
+    with dbapi_conn.cursor() as cur:
+        for name, value in LOAD_SESSION_SETTINGS.items():
+            cur.execute(f"SET {name} = '{value}'")
+    dbapi_conn.commit()
+
+
+def make_load_engine(**kwargs):
+    engine = create_engine(make_url(DB_NAME), **kwargs)
+    event.listen(engine, "connect", set_load_gucs)
+    return engine
+
+
 # DB & Schema Setup
 def ensure_database_exists():
     admin_engine = create_engine(make_url("postgres"), isolation_level="AUTOCOMMIT")
@@ -140,7 +193,7 @@ def load_zones_lookup(engine):
     with engine.begin() as conn:
         conn.execute(text(f'TRUNCATE TABLE "{SCHEMA_NAME}".zones'))
 
-    df.to_sql("zones", engine, schema=SCHEMA_NAME, if_exists="append", index=False)
+    copy_dataframe(engine, df, "zones", ["zone_id", "borough", "zone_name", "service_zone"])
     print(f"✅ Loaded {len(df)} zones.")
 
 
@@ -157,21 +210,40 @@ def drop_old_trips_if_any(engine):
             print("ℹ️ No existing trips table to drop.")
 
 
+def file_partition(path):
+    """(partition_name, from, to) for the month in a TLC file name, or None."""
+    m = re.search(r"(\d{4})-(\d{2})", os.path.basename(path))
+    if not m:
+        return None
+    year, month = int(m.group(1)), int(m.group(2))
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return (
+        f"trips_{year}_{month:02d}",
+        f"{year}-{month:02d}-01",
+        f"{next_year}-{next_month:02d}-01",
+    )
+
+
+def month_partitions():
+    """(partition_name, from, to) for each month in PARQUET_FILES."""
+    return sorted({p for p in map(file_partition, PARQUET_FILES) if p})
+
+
 def create_trips_table(engine):
     ddl = f"""
     CREATE TABLE IF NOT EXISTS "{SCHEMA_NAME}"."trips" (
-      trip_id SERIAL PRIMARY KEY,
+      trip_id SERIAL,
       pickup_time TIMESTAMP NOT NULL,
       dropoff_time TIMESTAMP NOT NULL,
       distance FLOAT,
       fare FLOAT,
       tip_amount FLOAT,
       total_amount FLOAT,
-      passenger_count INT,
-      pickup_zone_id INT REFERENCES "{SCHEMA_NAME}".zones(zone_id),
-      dropoff_zone_id INT REFERENCES "{SCHEMA_NAME}".zones(zone_id),
-      vendor_id VARCHAR(10) REFERENCES "{SCHEMA_NAME}".vendors(vendor_id),
-      payment_id INT REFERENCES "{SCHEMA_NAME}".payments(payment_id),
+      passenger_count SMALLINT,
+      pickup_zone_id INT,
+      dropoff_zone_id INT,
+      vendor_id VARCHAR(10),
+      payment_id INT,
       pickup_long FLOAT,
       pickup_lat FLOAT,
       dropoff_long FLOAT,
@@ -179,7 +251,7 @@ def create_trips_table(engine):
       pickup_weekday INT GENERATED ALWAYS AS (EXTRACT(DOW FROM pickup_time)) STORED,
       pickup_hour INT GENERATED ALWAYS AS (EXTRACT(HOUR FROM pickup_time)) STORED,
       trip_duration_min FLOAT GENERATED ALWAYS AS (EXTRACT(EPOCH FROM dropoff_time - pickup_time)/60) STORED,
-      ratecodeid INT NULL,
+      ratecodeid SMALLINT NULL,
       store_and_fwd_flag VARCHAR(1) NULL,
       extra FLOAT NULL,
       mta_tax FLOAT NULL,
@@ -188,13 +260,67 @@ def create_trips_table(engine):
       congestion_surcharge FLOAT NULL,
       airport_fee FLOAT NULL,
       cbd_congestion_fee FLOAT NULL
-    );
+    ) PARTITION BY RANGE (pickup_time);
     """
 
     with engine.begin() as conn:
         conn.execute(text(ddl))
+        # Partitions start UNLOGGED with autovacuum off (no WAL or vacuum
+        # work during COPY); finish_trips_load() switches both back.
+        # The partitioned parent has no storage, so it stays a plain table.
+        for name, lo, hi in month_partitions():
+            conn.execute(text(f"""
+                CREATE UNLOGGED TABLE IF NOT EXISTS "{SCHEMA_NAME}"."{name}"
+                PARTITION OF "{SCHEMA_NAME}".trips
+                FOR VALUES FROM ('{lo}') TO ('{hi}')
+                WITH (autovacuum_enabled = false);
+            """))
+        # Stray timestamps outside the loaded months (TLC files have a few)
+        conn.execute(text(f"""
+            CREATE UNLOGGED TABLE IF NOT EXISTS "{SCHEMA_NAME}".trips_default
+            PARTITION OF "{SCHEMA_NAME}".trips DEFAULT
+            WITH (autovacuum_enabled = false);
+        """))
+
+    print("✅ trips table created, partitioned by month (no keys or indexes yet).")
 
-    print("✅ trips table created (no indexes yet).")
+
+def trips_partitions():
+    return [name for name, _, _ in month_partitions()] + ["trips_default"]
+
+
+TRIPS_FOREIGN_KEYS = {
+    "fk_trips_pickup_zone": ("pickup_zone_id", "zones(zone_id)"),
+    "fk_trips_dropoff_zone": ("dropoff_zone_id", "zones(zone_id)"),
+    "fk_trips_vendor": ("vendor_id", "vendors(vendor_id)"),
+    "fk_trips_payment": ("payment_id", "payments(payment_id)"),
+}
+
+
+def finish_trips_load(engine):
+    """Make partitions LOGGED, add the PK and FKs, re-enable autovacuum.
+
+    SET LOGGED writes each partition to WAL once instead of per COPY'd row,
+    and validating each FK in one pass is far cheaper than a lookup per row.
+    """
+    with engine.begin() as conn:
+        for part in trips_partitions():
+            conn.execute(text(f'ALTER TABLE "{SCHEMA_NAME}"."{part}" SET LOGGED;'))
+        # Primary key built in one sort per partition rather than maintained
+        # row by row during COPY (it must include the partition key)
+        conn.execute(text(f"""
+            ALTER TABLE "{SCHEMA_NAME}".trips
+            ADD CONSTRAINT trips_pkey PRIMARY KEY (trip_id, pickup_time);
+        """))
+        for name, (col, ref) in TRIPS_FOREIGN_KEYS.items():
+            conn.execute(text(f"""
+                ALTER TABLE "{SCHEMA_NAME}".trips
+                ADD CONSTRAINT {name} FOREIGN KEY ({col}) REFERENCES "{SCHEMA_NAME}".{ref};
+            """))
+        for part in trips_partitions():
+            conn.execute(text(f'ALTER TABLE "{SCHEMA_NAME}"."{part}" RESET (autovacuum_enabled);'))
+
+    print("🔗 trips partitions logged, keys added, autovacuum re-enabled.")
 
 
 # =========================
@@ -238,119 +364,321 @@ TARGET_COLS = [
     "improvement_surcharge", "congestion_surcharge", "airport_fee", "cbd_congestion_fee",
 ]
 
+# Arrow types matching the trips columns exactly, as binary COPY requires
+TRIPS_ARROW_SCHEMA = pa.schema(
+    [(c, pa.timestamp("us")) for c in ("pickup_time", "dropoff_time")]
+    + [(c, pa.float64()) for c in ("distance", "fare", "tip_amount", "total_amount")]
+    + [("passenger_count", pa.int16())]
+    + [(c, pa.int32()) for c in ("pickup_zone_id", "dropoff_zone_id")]
+    + [("vendor_id", pa.string()), ("payment_id", pa.int32())]
+    + [(c, pa.float64()) for c in ("pickup_long", "pickup_lat", "dropoff_long", "dropoff_lat")]
+    + [("ratecodeid", pa.int16()), ("store_and_fwd_flag", pa.string())]
+    + [(c, pa.float64()) for c in (
+        "extra", "mta_tax", "tolls_amount", "improvement_surcharge",
+        "congestion_surcharge", "airport_fee", "cbd_congestion_fee",
+    )]
+)
+assert TRIPS_ARROW_SCHEMA.names == TARGET_COLS
+
+# Arrow-backed nullable ints sized to the trips columns: passenger_count and
+# ratecodeid are single digits (SMALLINT), zone ids keep INT to match zones
+INT_DTYPES = {
+    "passenger_count": pd.ArrowDtype(pa.int16()),
+    "ratecodeid": pd.ArrowDtype(pa.int16()),
+    "pickup_zone_id": pd.ArrowDtype(pa.int32()),
+    "dropoff_zone_id": pd.ArrowDtype(pa.int32()),
+}
+
 VENDOR_MAP = {1: "CMT", 2: "VTS"}
+VENDOR_CODES = pd.Index(list(VENDOR_MAP))
 VALID_PAYMENTS = {1, 2, 3, 4, 5, 6}
+# VALID_PAYMENTS is a contiguous range, so membership is two comparisons
+PAYMENT_MIN, PAYMENT_MAX = min(VALID_PAYMENTS), max(VALID_PAYMENTS)
+
+
+DATETIME_COLS = ("pickup_time", "dropoff_time")
+FLOAT_COLS = (
+    "distance", "fare", "tip_amount", "total_amount",
+    "pickup_long", "pickup_lat", "dropoff_long", "dropoff_lat",
+    "extra", "mta_tax", "tolls_amount", "improvement_surcharge",
+    "congestion_surcharge", "airport_fee", "cbd_congestion_fee",
+)
 
 
-def coerce_types(df):
+def coerce_plan(df):
+    """Columns of df that still need converting, per target type.
+
+    Parquet batches from one file share a schema, so insert_parquet builds
+    this once from the first batch. Columns that already arrive with the
+    right dtype (TLC timestamps and doubles usually do) are left out.
+    """
+    return {
+        "dt": [c for c in DATETIME_COLS
+               if c in df.columns and not pd.api.types.is_datetime64_any_dtype(df[c])],
+        "float": [c for c in FLOAT_COLS
+                  if c in df.columns and not pd.api.types.is_float_dtype(df[c])],
+        "int": [c for c, dtype in INT_DTYPES.items() if c in df.columns and df[c].dtype != dtype],
+    }
+
+
+def coerce_types(df, plan=None):
+    if plan is None:
+        plan = coerce_plan(df)
+
     # Datetimes
-    for col in ("pickup_time", "dropoff_time"):
-        if col in df.columns:
-            df[col] = pd.to_datetime(df[col], errors="coerce")
+    for col in plan["dt"]:
+        df[col] = pd.to_datetime(df[col], errors="coerce")
 
     # Floats
-    for col in [
-        "distance", "fare", "tip_amount", "total_amount",
-        "pickup_long", "pickup_lat", "dropoff_long", "dropoff_lat",
-        "extra", "mta_tax", "tolls_amount", "improvement_surcharge",
-        "congestion_surcharge", "airport_fee", "cbd_congestion_fee",
-    ]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+    for col in plan["float"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
 
-    # Integers
-    for col in ["passenger_count", "ratecodeid", "pickup_zone_id", "dropoff_zone_id"]:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+    # Integers: Arrow-backed (native null bitmap, same width as the DB
+    # columns) rather than pandas' masked Int64
+    for col in plan["int"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype(INT_DTYPES[col])
 
-    # Vendor
+    # Vendor: raw code -> category code (-1 = unknown -> NULL), no per-row strings
     if "vendor_raw" in df.columns:
-        df["vendor_id"] = df["vendor_raw"].map(VENDOR_MAP).astype("string")
+        df["vendor_id"] = pd.Categorical.from_codes(
+            VENDOR_CODES.get_indexer(df["vendor_raw"]),
+            categories=list(VENDOR_MAP.values()),
+        )
 
-    # Payment
+    # Payment: anything missing or unrecognised becomes 5 (Unknown)
     if "payment_type_raw" in df.columns:
-        df["payment_id"] = (
-            pd.to_numeric(df["payment_type_raw"], errors="coerce")
-            .fillna(5)
-            .astype(int)
-        )
-        df.loc[~df["payment_id"].isin(VALID_PAYMENTS), "payment_id"] = 5
+        payment = pd.to_numeric(df["payment_type_raw"], errors="coerce").fillna(5).to_numpy(dtype="int32")
+        np.putmask(payment, (payment < PAYMENT_MIN) | (payment > PAYMENT_MAX), 5)
+        df["payment_id"] = payment
 
     return df
 
 
-def insert_parquet(df, engine, file_index, start_time, total_rows):
-    chunk_size = 200_000
-    num_chunks = (len(df) // chunk_size) + 1
+def run_copy(engine, sql, buf):
+    """Stream buf into a COPY ... FROM STDIN statement and commit."""
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            cur.copy_expert(sql, buf)
+        raw.commit()
+    finally:
+        raw.close()
 
-    print(f"   → Splitting into {num_chunks} chunks (size={chunk_size})")
 
-    for chunk_idx in range(num_chunks):
-        start_row = chunk_idx * chunk_size
-        end_row = start_row + chunk_size
-        chunk = df.iloc[start_row:end_row]
+def insert_values(engine, df, table, columns):
+    """Fallback when COPY is unavailable: INSERT ... VALUES %s, 10k rows a page.
 
-        if chunk.empty:
-            continue
+    Runs execute_values straight on the pooled DBAPI connection (the same
+    one for every batch of a worker), skipping to_sql's per-call table
+    reflection and statement compilation.
+    """
+    rows = df[columns].astype(object).where(df[columns].notna(), None)
+    cols = ", ".join(columns)
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            execute_values(
+                cur,
+                f'INSERT INTO "{SCHEMA_NAME}".{table} ({cols}) VALUES %s',
+                rows.itertuples(index=False, name=None),
+                page_size=10_000,
+            )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def copy_dataframe(engine, df, table, columns):
+    """Bulk-load df into table with COPY FROM STDIN (one round-trip per call).
+
+    Much faster than multi-row INSERTs: no per-row statement parse/plan.
+    NaN / NA / NaT are written as \\N, the COPY null marker.
+    """
+    if not USE_COPY:
+        insert_values(engine, df, table, columns)
+        return
 
-        # normalize column names
-        chunk.columns = [c.lower().strip().replace(" ", "_") for c in chunk.columns]
-        rename_map = {src: dst for src, dst in CSV_TO_DB_RENAME.items() if src in chunk.columns}
-        chunk = chunk.rename(columns=rename_map)
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, na_rep="\\N")
+    buf.seek(0)
 
-        # type conversions
-        chunk = coerce_types(chunk)
+    cols = ", ".join(columns)
+    run_copy(engine, f'''COPY "{SCHEMA_NAME}".{table} ({cols}) FROM STDIN WITH (FORMAT CSV, NULL '\\N')''', buf)
 
-        # ensure all expected columns exist
-        for col in TARGET_COLS:
-            if col not in chunk.columns:
-                chunk[col] = pd.NA
 
-        # remove rows missing required fields
-        out = chunk[TARGET_COLS].dropna(
-            subset=["pickup_time", "dropoff_time", "fare"],
-            how="any"
-        )
+def copy_arrow(engine, arrow_table, table):
+    """Bulk-load an Arrow table with binary COPY.
 
-        if out.empty:
-            print(f"      ⚠️ Chunk {chunk_idx+1}/{num_chunks} → 0 valid rows (skipped)")
-            continue
-
-        out.to_sql(
-            "trips",
-            engine,
-            schema=SCHEMA_NAME,
-            if_exists="append",
-            index=False,
-            method="multi",
-            chunksize=50_000,
-        )
+    Values go over the wire in Postgres' binary format, so the server does no
+    text -> float/timestamp parsing and floats take 8 bytes instead of ~15.
+    """
+    encoder = ArrowToPostgresBinaryEncoder(arrow_table.schema)
+    buf = io.BytesIO()
+    buf.write(encoder.write_header())
+    for batch in arrow_table.to_batches():
+        buf.write(encoder.write_batch(batch))
+    buf.write(encoder.finish())
+    buf.seek(0)
 
-        # update running total
-        total_rows += len(out)
+    cols = ", ".join(arrow_table.schema.names)
+    run_copy(engine, f'COPY "{SCHEMA_NAME}".{table} ({cols}) FROM STDIN WITH (FORMAT BINARY)', buf)
+
+
+def copy_trips(engine, out, table="trips"):
+    if USE_COPY and ArrowToPostgresBinaryEncoder:
+        # Convert as-is and cast on the Arrow side (dictionary vendor_id ->
+        # utf8, ns -> us timestamps) rather than copying the frame in pandas
+        arrow_table = pa.Table.from_pandas(out, preserve_index=False).cast(TRIPS_ARROW_SCHEMA)
+        copy_arrow(engine, arrow_table, table)
+    else:
+        copy_dataframe(engine, out, table, TARGET_COLS)
 
-        print(
-            f"      ✅ File {file_index} — chunk {chunk_idx+1}/{num_chunks} "
-            f"inserted ({len(out):,} rows). Total={total_rows:,}. "
-            f"Elapsed={time.time()-start_time:.1f}s"
-        )
 
+def copy_trips_routed(engine, out, partition):
+    """COPY rows of the file's month straight into its partition.
+
+    Skips per-row partition routing on the parent; the few stray
+    timestamps outside the month still go through trips.
+    """
+    if partition is None:
+        copy_trips(engine, out)
+        return
+
+    name, lo, hi = partition
+    in_month = (out["pickup_time"] >= pd.Timestamp(lo)) & (out["pickup_time"] < pd.Timestamp(hi))
+    copy_trips(engine, out[in_month], name)
+    if not in_month.all():
+        copy_trips(engine, out[~in_month])
+
+
+def insert_parquet(pf, engine, file_index, start_time, total_rows, partition=None):
+    chunk_size = LOAD_BATCH_ROWS
+    num_chunks = max(1, math.ceil(pf.metadata.num_rows / chunk_size))
+
+    print(f"   → Streaming {num_chunks} batches (size={chunk_size})")
+
+    # Decode/coerce of batch N+1 overlaps the COPY of batch N on a single
+    # copier thread; at most one COPY is in flight, bounding memory to
+    # about two batches and the worker to its one connection.
+    plan = None
+    pending = None
+    with ThreadPoolExecutor(max_workers=1) as copier:
+        for chunk_idx, chunk in enumerate(iter_trip_batches(pf, chunk_size)):
+            if chunk.empty:
+                continue
+
+            # batches arrive with DB column names; coerce and add any columns the
+            # file lacks (reindex fills them with NULL)
+            if plan is None:
+                plan = coerce_plan(chunk)
+            out = coerce_types(chunk, plan).reindex(columns=TARGET_COLS)
+
+            # Nulls were already filtered on the Arrow batch, so this normally
+            # only catches values coerce_types could not parse; copy rows only
+            # when something actually has to go
+            valid = out["pickup_time"].notna() & out["dropoff_time"].notna() & out["fare"].notna()
+            if not valid.all():
+                out = out[valid]
+
+            if out.empty:
+                log.info("File %d chunk %d/%d: 0 valid rows (skipped)", file_index, chunk_idx + 1, num_chunks)
+                continue
+
+            if pending is not None:
+                pending.result()
+            pending = copier.submit(copy_trips_routed, engine, out, partition)
+
+            # update running total
+            total_rows += len(out)
+
+            if chunk_idx % PROGRESS_EVERY == 0:
+                log.info("File %d chunk %d/%d: %d rows, total=%d",
+                         file_index, chunk_idx + 1, num_chunks, len(out), total_rows)
+
+        if pending is not None:
+            pending.result()
+
+    print(
+        f"      ✅ File {file_index} done — total={total_rows:,}. "
+        f"Elapsed={time.time()-start_time:.1f}s"
+    )
     return total_rows
 
 
+def normalize_column(name):
+    return name.lower().strip().replace(" ", "_")
 
-def load_data(engine):
-    total_rows = 0
-    start = time.time()
 
-    for i, path in enumerate(PARQUET_FILES, start=1):
-        if not os.path.exists(path):
-            print(f"❌ Missing file: {path}")
-            continue
+def iter_trip_batches(pf, batch_size):
+    """Stream a TLC parquet file as DataFrames of at most batch_size rows.
+
+    Only the columns in CSV_TO_DB_RENAME are decoded and only one batch is
+    held in memory at a time. Rows missing a pickup/dropoff time or fare are
+    filtered out on the Arrow batch before it is converted to pandas.
+    Column names are resolved once from the file schema and each batch is
+    yielded already renamed to its trips column names.
+    """
+    names = {normalize_column(c): c for c in pf.schema_arrow.names}
+    columns = [src for norm, src in names.items() if norm in CSV_TO_DB_RENAME]
+    db_names = {names[norm]: CSV_TO_DB_RENAME[norm] for norm in names if norm in CSV_TO_DB_RENAME}
+    required = [
+        names[norm]
+        for norm in ("tpep_pickup_datetime", "tpep_dropoff_datetime", "fare_amount")
+        if norm in names
+    ]
+
+    out_names = None
+    for batch in pf.iter_batches(batch_size=batch_size, columns=columns):
+        mask = None
+        for col in required:
+            valid = pc.is_valid(batch.column(col))
+            mask = valid if mask is None else pc.and_(mask, valid)
+        if mask is not None:
+            batch = batch.filter(mask)
+        # Every batch of a file shares one schema: resolve the trips names on
+        # the first and relabel the rest zero-copy on the Arrow side
+        if out_names is None:
+            out_names = [db_names[c] for c in batch.schema.names]
+        yield pa.RecordBatch.from_arrays(batch.columns, names=out_names).to_pandas()
+
+
+def ingest_one_file(path, file_index, start_time):
+    """Load one parquet file in a worker process; returns rows inserted.
+
+    Engines and their pooled connections are not fork-safe, so each worker
+    builds (and disposes) its own.
+    """
+    if not os.path.exists(path):
+        print(f"❌ Missing file: {path}")
+        return 0
 
+    engine = make_load_engine(pool_size=1, max_overflow=0)
+    try:
         print(f"📂 Reading: {path}")
-        df = pd.read_parquet(path)
-        total_rows = insert_parquet(df, engine, i, start, total_rows)
+        # memory_map: read column chunks straight from the page cache
+        # instead of copying them into a separate read buffer
+        pf = pq.ParquetFile(path, memory_map=True)
+        return insert_parquet(pf, engine, file_index, start_time, 0, file_partition(path))
+    finally:
+        engine.dispose()
+
+
+def load_data():
+    """Ingest PARQUET_FILES in parallel, one file per worker process.
+
+    Each COPY commits on its own connection, so files have no ordering
+    dependency and parsing one file overlaps with COPY of another.
+    """
+    total_rows = 0
+    start = time.time()
+
+    with ProcessPoolExecutor(max_workers=LOAD_WORKERS) as ex:
+        futures = [
+            ex.submit(ingest_one_file, path, i, start)
+            for i, path in enumerate(PARQUET_FILES, start=1)
+        ]
+        for fut in as_completed(futures):
+            total_rows += fut.result()
 
     print(f"🎉 Finished — inserted {total_rows:,} rows in {time.time()-start:.1f}s")
 
@@ -366,10 +694,11 @@ def vacuum_analyze(engine):
 # Main
 
 def main():
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper())
     print(f"🔌 Connecting to PostgreSQL on {PGHOST}:{PGPORT} as {PGUSER}")
     ensure_database_exists()
 
-    engine = create_engine(make_url(DB_NAME))
+    engine = make_load_engine()
 
     ensure_schema(engine)
     create_reference_tables(engine)
@@ -379,7 +708,8 @@ def main():
 
     load_zones_lookup(engine)
     create_trips_table(engine)
-    load_data(engine)
+    load_data()
+    finish_trips_load(engine)
     vacuum_analyze(engine)
 
     engine.dispose()
@@ -0,0 +1,17 @@
+"""
+Production entry point: gunicorn with gevent workers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Monkey-patching must happen before anything opens a socket. psycopg (v3)
+detects the patched environment and waits cooperatively, so one worker
+serves many requests while they are blocked on Postgres.
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+from app.main import create_app  # noqa: E402
+
+app = create_app()